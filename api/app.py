@@ -1,76 +1,244 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain, count, islice
+from operator import attrgetter, eq, ge, gt, itemgetter, le, lt, ne
+import dataclasses
 import json
+import math
+import os
 import re
-from typing import List, Dict, Any
-import uuid
+import secrets
+import sys
+import threading
+import time
+from typing import List, Dict, Any, Callable, NamedTuple, Tuple
+import orjson
+
+try:
+    import numpy as np
+except ImportError:  # batch processing falls back to the compiled rule predicates
+    np = None
+try:
+    from numba import njit, prange
+except ImportError:  # numeric rules in a batch run as NumPy masks instead
+    njit = None
+    prange = range
 
 app = Flask(__name__)
 CORS(app)
 
 # In-memory storage
 rules_storage = {}
-processed_data = []
+parsed_rules = {}  # rule_id -> parsed conditions, kept in sync with rules_storage
+compiled_rules = {}  # rule_id -> predicate compiled from parsed_rules
+flat_rules = {}  # rule_id -> parsed_rules flattened for the instrumented evaluator
+_field_to_rules = {}  # payload field -> ids of rules anchored on it
+_rule_anchors = {}  # rule_id -> the fields it is indexed under in _field_to_rules
+MAX_PROCESSED = int(os.environ.get('MAX_PROCESSED', 1000))  # processed history size
+processed_data = deque(maxlen=MAX_PROCESSED)
 statistics_cache = {}
+_label_index = {}  # label -> processed entries carrying it, in arrival order
+_label_totals = Counter()  # running label counts over processed_data
+_labeled_total = 0  # processed entries with at least one label
+_rule_match_totals = Counter()  # rule_id -> processed entries it matched
+_day_totals = {}  # 'YYYY-MM-DD' -> DayTotals for that day's processed entries, oldest first
+_active_sorted = ()  # enabled rules by priority, rebuilt by refresh_active_rules()
+_active_label_count = 0  # distinct labels among _active_sorted, None if not countable
+_data_version = 0  # bumped on every rule or processed data change; keys response caches
+STATS_CACHE_SECONDS = 5  # how long cached statistics may lag the clock-relative rates
+_MISSING = object()
+_PLAIN_NUMBERS = frozenset((int, float))  # exact types ordering compares without coercion
+
+# Key, operator and value of a single condition. The key is one greedy run of
+# characters up to the first operator (a '!' only ends it when followed by '='),
+# which avoids backtracking character by character; it still needs stripping
+# and may come back empty.
+# Two-character operators are tried before '=', '>', '<', and the value group
+# comes back already stripped of whitespace and quotes
+_COND_RE = re.compile(r'([^<>=!]*(?:!(?!=)[^<>=!]*)*)(>=|<=|!=|=|>|<)\s*(?=\S)["\']*(.*?)["\']*\s*$')
+
+KERNEL_MIN_BATCH = 64  # smaller batches are not worth a Numba kernel call
+_OP_CODES = {'=': 0, '!=': 1, '<': 2, '>': 3, '<=': 4, '>=': 5}  # operator -> packed rule op code
+FLUSH_SIZE = 100  # entries a thread buffers before merging them into processed_data
+_history_lock = threading.RLock()  # held while merging buffers into processed_data or reading it
+_local = threading.local()  # per-thread buffer of processed entries
+_pending = []  # (thread, buffer) for every thread that has buffered entries
+USAGE_LOCK_SHARDS = 16  # locks guarding rule usage counters; a power of two
+_usage_locks = tuple(threading.Lock() for _ in range(USAGE_LOCK_SHARDS))
+_reorder_lock = threading.Lock()  # held by the one request re-sorting parsed_rules
+_rules_lock = threading.RLock()  # serialises rule changes, the condition reorder's included
+MATCH_CACHE_SIZE = 4096  # distinct payloads whose matching rule ids are remembered
+_match_cache = {}  # (rules version, first_match_per_label, payload_key()) -> matched rule ids
+_match_cache_lock = threading.Lock()  # held while inserting into, evicting from or clearing _match_cache
+_rules_version = 0  # bumped by refresh_active_rules() once a rule change is in place
+
+def _source_literal(value: Any, namespace: Dict) -> str:
+    """Spell a parsed rule value in generated source
+    repr() round-trips everything parse_condition produces except nan/inf,
+    which are bound as names in the generated code's namespace instead
+    """
+    if isinstance(value, float) and not math.isfinite(value):
+        name = f'_c{len(namespace)}'
+        namespace[name] = value
+        return name
+    return repr(value)
+
+def to_number(value: Any) -> float:
+    """Coerce a payload value for an ordering comparison against a number
+    Values that are not numeric become NaN, which compares False with everything
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def ordering_bound(value: Any) -> Any:
+    """Get the numeric rule value an ordering comparison runs against
+    That is the value as a float, or the int itself when it is beyond float
+    range; Python compares ints with floats exactly either way
+    """
+    try:
+        return float(value)
+    except OverflowError:
+        return value
+
+def _ordered_number(op: Callable) -> Callable[[Any, float], bool]:
+    """Ordering against a numeric rule value; non-numeric payload values compare False"""
+    return lambda actual_value, expected_value: op(
+        actual_value if actual_value.__class__ in _PLAIN_NUMBERS else to_number(actual_value),
+        expected_value)
+
+def _ordered_string(op: Callable) -> Callable[[Any, str], bool]:
+    """Ordering against a string rule value compares the payload value as a string"""
+    return lambda actual_value, expected_value: op(str(actual_value), expected_value)
+
+# FlatRule compare code -> comparison. Codes 0-5 are _OP_CODES (ordering
+# against a float rule value); 6-9 are the ordering operators against a string
+_FLAT_COMPARES = (eq, ne) + tuple(map(_ordered_number, (lt, gt, le, ge))) + tuple(map(_ordered_string, (lt, gt, le, ge)))
+
+def intern_label(label: Any) -> Any:
+    """Intern string labels so every rule and processed entry shares one copy"""
+    return sys.intern(label) if type(label) is str else label
+
+def _now() -> Tuple[float, str]:
+    """Current time as (epoch seconds, ISO string) from a single clock read
+    Both come from one datetime so the epoch round-trips through the ISO string
+    """
+    now = datetime.now()
+    return now.timestamp(), now.isoformat()
+
+def _next_id() -> str:
+    """Generate a random 128-bit id as 32 hex characters
+    At least a uuid4's randomness without building a UUID object per call
+    """
+    return secrets.token_hex(16)
+
+def intern_keys(payload: Dict) -> Dict:
+    """Re-key a payload with interned field names
+    Field names repeat across every stored payload and every rule lookup, so
+    interning shares their storage and lets dict lookups hit on identity
+    """
+    return {sys.intern(key): value for key, value in payload.items()}
+
+class Condition(NamedTuple):
+    """A single parsed condition like 'Price > 5'"""
+    key: str
+    operator: str
+    value: Any
+
+# OR groups, each a tuple of AND conditions
+ParsedRule = Tuple[Tuple[Condition, ...], ...]
+
+class FlatRule(NamedTuple):
+    """A parsed rule as parallel per-condition arrays
+    OR group g holds the conditions at indices group_starts[g] to group_starts[g + 1]
+    """
+    keys: Tuple[str, ...]
+    ops: bytes  # compare codes into _FLAT_COMPARES
+    values: Tuple[Any, ...]
+    group_starts: Tuple[int, ...]
+    conditions: Tuple[Condition, ...]  # the original conditions, keying condition_stats
+
+@dataclass(slots=True)
+class ProcessedEntry:
+    """A labelled payload kept in the processed history"""
+    id: str
+    payload: Dict
+    labels: List[str]
+    matched_rules: List[str]
+    timestamp: str
+    ts_epoch: float
+    processing_time_ms: int = 0  # Could be calculated if needed
+    
+    def to_dict(self) -> Dict:
+        """Serialize for JSON responses"""
+        return {
+            'id': self.id,
+            'payload': self.payload,
+            'labels': self.labels,
+            'matched_rules': self.matched_rules,
+            'timestamp': self.timestamp,
+            'processing_time_ms': self.processing_time_ms
+        }
+
+@dataclass(slots=True)
+class DayTotals:
+    """Running statistics over one day's processed entries"""
+    entries: int = 0
+    labeled: int = 0
+    labels: Counter = dataclasses.field(default_factory=Counter)
 
 class RuleEngine:
+    REORDER_INTERVAL = 1000  # condition evaluations between selectivity re-sorts
+    PROFILE_INTERVAL = 16  # one payload in N runs the instrumented evaluator
+    
     def __init__(self):
         self.operators = {
-            '=': lambda x, y: x == y,
-            '!=': lambda x, y: x != y,
-            '<': lambda x, y: float(x) < float(y),
-            '>': lambda x, y: float(x) > float(y),
-            '<=': lambda x, y: float(x) <= float(y),
-            '>=': lambda x, y: float(x) >= float(y)
+            '=': eq,
+            '!=': ne,
+            '<': lt,
+            '>': gt,
+            '<=': le,
+            '>=': ge
         }
+        self.condition_stats = {}  # Condition -> [eval_count, fail_count]
+        self.evaluations = 0  # approximate under threads; only paces reordering
+        self.payloads = count(1)  # next() is atomic, unlike += on a shared int
     
-    def parse_condition(self, condition: str) -> Dict:
+    def parse_condition(self, condition: str) -> Condition:
         """Parse a single condition like 'Price > 5'"""
-        condition = condition.strip()
-        
-        for op in ['>=', '<=', '!=', '=', '>', '<']:
-            if op in condition:
-                key, value = condition.split(op, 1)
-                key = key.strip()
-                value = value.strip().strip('"\'')
-                
-                # Try to convert to number if possible
-                try:
-                    value = float(value)
-                    if value.is_integer():
-                        value = int(value)
-                except ValueError:
-                    pass
-                
-                return {
-                    'key': key,
-                    'operator': op,
-                    'value': value
-                }
+        match = _COND_RE.match(condition)
+        if not match:
+            raise ValueError(f"Invalid condition format: {condition.strip()}")
         
-        raise ValueError(f"Invalid condition format: {condition}")
-    
-    def evaluate_condition(self, condition: Dict, data: Dict) -> bool:
-        """Evaluate a single condition against data"""
-        key = condition['key']
-        operator = condition['operator']
-        expected_value = condition['value']
-        
-        if key not in data:
-            return False
-        
-        actual_value = data[key]
+        key, op, value = match.groups()
+        key = key.strip()
+        if not key:
+            raise ValueError(f"Invalid condition format: {condition.strip()}")
+        key = sys.intern(key)
         
+        # Try to convert to number if possible, integers first as the common case
         try:
-            return self.operators[operator](actual_value, expected_value)
-        except (ValueError, TypeError):
-            # For string comparisons
-            return self.operators[operator](str(actual_value), str(expected_value))
+            value = int(value)
+        except ValueError:
+            try:
+                value = float(value)
+                if value.is_integer():
+                    value = int(value)
+            except ValueError:
+                pass
+        
+        return Condition(key, op, value)
     
-    def parse_rule(self, rule_text: str) -> List[List[Dict]]:
+    def parse_rule(self, rule_text: str) -> ParsedRule:
         """Parse rule text into conditions
-        Returns list of OR groups, each containing list of AND conditions
+        Returns tuple of OR groups, each containing tuple of AND conditions
         """
         # Split by OR first
         or_groups = rule_text.split(' OR ')
@@ -81,27 +249,672 @@ class RuleEngine:
             and_conditions = or_group.split(' AND ')
             parsed_conditions = []
             
+            # Conditions repeat across rules, so each is parsed through the shared cache
             for condition in and_conditions:
-                parsed_conditions.append(self.parse_condition(condition))
+                parsed_conditions.append(parse_condition_text(condition))
             
-            parsed_groups.append(parsed_conditions)
+            parsed_groups.append(tuple(parsed_conditions))
         
-        return parsed_groups
+        return tuple(parsed_groups)
     
-    def evaluate_rule(self, rule_conditions: List[List[Dict]], data: Dict) -> bool:
-        """Evaluate rule against data
+    def flatten_rule(self, rule_conditions: ParsedRule) -> FlatRule:
+        """Flatten parsed conditions into parallel arrays for evaluate_rule_flat
+        Equality keeps the rule value as parsed; ordering gets a compare code for
+        a numeric (value as float) or string rule value
+        """
+        keys, ops, values, group_starts, conditions = [], bytearray(), [], [0], []
+        for or_group in rule_conditions:
+            for condition in or_group:
+                op = _OP_CODES[condition.operator]
+                value = condition.value
+                if op > 1:
+                    if isinstance(value, (int, float)):
+                        value = ordering_bound(value)
+                    else:
+                        op += 4
+                keys.append(condition.key)
+                ops.append(op)
+                values.append(value)
+                conditions.append(condition)
+            group_starts.append(len(keys))
+        return FlatRule(tuple(keys), bytes(ops), tuple(values), tuple(group_starts), tuple(conditions))
+    
+    def evaluate_rule_flat(self, flat: FlatRule, data: Dict) -> bool:
+        """Evaluate a flattened rule against data, tracking how often each condition fails
         Rule is satisfied if ANY OR group is satisfied
         OR group is satisfied if ALL AND conditions are satisfied
         """
+        keys, ops, values, group_starts, conditions = flat
+        d_get = data.get
+        compares = _FLAT_COMPARES
+        condition_stats = self.condition_stats
+        evaluated = 0
+        result = False
+        for g in range(len(group_starts) - 1):
+            for i in range(group_starts[g], group_starts[g + 1]):
+                evaluated += 1
+                stats = condition_stats.get(conditions[i])
+                if stats is None:
+                    stats = condition_stats[conditions[i]] = [0, 0]
+                stats[0] += 1
+                actual_value = d_get(keys[i], _MISSING)
+                if actual_value is _MISSING or not compares[ops[i]](actual_value, values[i]):
+                    stats[1] += 1
+                    break
+            else:
+                result = True
+                break
+        
+        self.evaluations += evaluated
+        return result
+    
+    def reorder_conditions(self, rule_conditions: ParsedRule) -> ParsedRule:
+        """Order each AND group so the conditions that fail most often run first,
+        cheaper comparisons breaking ties, and the OR groups so the one most
+        likely to pass runs first; both maximise early exits
+        """
+        def fail_rate(condition):
+            eval_count, fail_count = self.condition_stats.get(condition, (0, 0))
+            return fail_count / eval_count if eval_count else 0
+        
+        def cost(condition):
+            # Equality is one comparison, numeric ordering may coerce, string ordering calls str()
+            if condition.operator in ('=', '!='):
+                return 0
+            return 1 if isinstance(condition.value, (int, float)) else 2
+        
+        def pass_rate(or_group):
+            # Treats conditions as independent; unseen ones count as always passing
+            # so a group without data gets tried, and profiled, early
+            return math.prod(1 - fail_rate(condition) for condition in or_group)
+        
+        and_groups = [tuple(sorted(or_group, key=lambda c: (-fail_rate(c), cost(c)))) for or_group in rule_conditions]
+        return tuple(sorted(and_groups, key=pass_rate, reverse=True))
+    
+    def compile_rule(self, rule_conditions: ParsedRule) -> Callable[[Dict], bool]:
+        """Compile parsed conditions into a single predicate function
+        Each OR group becomes an `and` chain and the groups are joined with `or`,
+        so a rule is one Python call with native short-circuiting instead of a
+        dispatch per condition
+        """
+        # Globals the generated code uses are bound directly in its namespace,
+        # so each is one dict lookup instead of a miss before builtins
+        namespace = {'_MISSING': _MISSING, '_PLAIN': _PLAIN_NUMBERS, '_num': to_number, '_str': str}
+        
+        def literal(value):
+            return _source_literal(value, namespace)
+        
+        groups = []
         for or_group in rule_conditions:
-            # Check if all AND conditions in this OR group are satisfied
-            if all(self.evaluate_condition(condition, data) for condition in or_group):
-                return True
+            terms = []
+            fetched = {}  # key -> local already holding its (present) value in this group
+            for condition in or_group:
+                op = condition.operator
+                value = condition.value
+                v = fetched.get(condition.key)
+                if v is None:
+                    v = f'_v{len(fetched)}'
+                if op in ('=', '!='):
+                    test = f"{v} {'==' if op == '=' else '!='} {literal(value)}"
+                elif isinstance(value, (int, float)):
+                    # Plain numbers compare directly; only other values pay for to_number()
+                    bound = literal(ordering_bound(value))
+                    test = f"({v} {op} {bound} if {v}.__class__ in _PLAIN else _num({v}) {op} {bound})"
+                else:
+                    test = f"_str({v}) {op} {literal(value)}"
+                if condition.key in fetched:
+                    terms.append(test)
+                else:
+                    fetched[condition.key] = v
+                    terms.append(f"(({v} := d.get({condition.key!r}, _MISSING)) is not _MISSING and {test})")
+            groups.append('(' + ' and '.join(terms) + ')')
         
-        return False
+        source = 'def rule(d):\n    return ' + (' or '.join(groups) or 'False') + '\n'
+        exec(compile(source, '<rule>', 'exec'), namespace)
+        return namespace['rule']
+    
+    def kernel_signature(self, rule_conditions: ParsedRule):
+        """Get the canonical (key, operator, value) form of a rule for pack_rules,
+        or None if any condition compares against a string or an int the
+        kernel's float64 cannot hold exactly (beyond 2**53, as numeric_column
+        rejects on the payload side)
+        Terms and groups are sorted so reordering a rule keeps its signature
+        """
+        groups = []
+        for or_group in rule_conditions:
+            for condition in or_group:
+                value = condition.value
+                if not isinstance(value, (int, float)) or (type(value) is int and abs(value) > 2 ** 53):
+                    return None
+            groups.append(tuple(sorted(or_group)))
+        return tuple(sorted(groups))
 
 rule_engine = RuleEngine()
 
+@lru_cache(maxsize=1024)
+def parse_condition_text(condition: str) -> Condition:
+    """Parse a single condition, reusing the result for text seen before"""
+    return rule_engine.parse_condition(condition)
+
+@lru_cache(maxsize=1024)
+def parse_rule_text(rule_text: str) -> ParsedRule:
+    """Parse rule text, reusing the result for text seen before
+    Parsed rules are immutable tuples, so cached results are safe to share
+    """
+    return rule_engine.parse_rule(rule_text)
+
+def bump_data_version():
+    """Invalidate cached responses after a rule or processed data change"""
+    global _data_version
+    _data_version += 1
+
+def refresh_active_rules():
+    """Rebuild the active rule ordering and drop payload matches after any rule change
+    Rules change rarely, so the ordering is rebuilt here once rather than
+    checked and rebuilt on the request path
+    """
+    global _active_sorted, _active_label_count, _rules_version
+    active_rules = [rule for rule in rules_storage.values() if rule['enabled']]
+    active_rules.sort(key=lambda x: x['priority'], reverse=True)
+    try:
+        _active_label_count = len({rule['label'] for rule in active_rules})
+    except TypeError:  # non-string labels may be unhashable
+        _active_label_count = None
+    _active_sorted = tuple(active_rules)
+    # Bumped only once the new rules are in place, so a match keyed with the
+    # new version never saw the old ones; entries under older versions are
+    # unreachable and are only cleared to free them
+    _rules_version += 1
+    with _match_cache_lock:
+        _match_cache.clear()
+    bump_data_version()
+
+def json_response(obj: Any, status: int = 200):
+    """Serialize with orjson for the high-traffic endpoints"""
+    return app.response_class(
+        orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS),
+        status=status,
+        mimetype='application/json'
+    )
+
+def conditional_json(etag: str, build: Callable[[], Any]):
+    """Respond 304 when the client already holds this version, else build the JSON body"""
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        response = json_response(build())
+    response.set_etag(etag)
+    return response
+
+def get_active_rules() -> Tuple[Dict, ...]:
+    """Get enabled rules sorted by priority"""
+    return _active_sorted
+
+def rule_anchors(rule_conditions: ParsedRule) -> set:
+    """Pick one field per OR group that a payload needs for that group to match
+    Every condition needs its field present, so any field of a group will do;
+    the one fewest rules are indexed under keeps candidate sets smallest
+    """
+    return {
+        min(sorted({condition.key for condition in or_group}), key=lambda field: len(_field_to_rules.get(field, ())))
+        for or_group in rule_conditions
+    }
+
+def cache_rule(rule_id: str, rule_conditions: ParsedRule):
+    """Store a rule's parsed conditions, compiled and flattened forms and field index entries
+    Everything is built before anything is replaced, and new index entries go
+    in before stale ones come out, so concurrent matching never misses the rule
+    """
+    compiled = rule_engine.compile_rule(rule_conditions)
+    flat = rule_engine.flatten_rule(rule_conditions)
+    anchors = rule_anchors(rule_conditions)
+    for field in anchors:
+        _field_to_rules.setdefault(field, set()).add(rule_id)
+    compiled_rules[rule_id] = compiled
+    flat_rules[rule_id] = flat
+    parsed_rules[rule_id] = rule_conditions
+    unindex_rule(rule_id, _rule_anchors.get(rule_id, set()) - anchors)
+    _rule_anchors[rule_id] = anchors
+
+def unindex_rule(rule_id: str, fields):
+    """Remove a rule from the field index under the given fields"""
+    for field in fields:
+        rule_ids = _field_to_rules[field]
+        rule_ids.discard(rule_id)
+        if not rule_ids:
+            del _field_to_rules[field]
+
+def forget_rule(rule_id: str):
+    """Drop everything cached for a rule"""
+    parsed_rules.pop(rule_id, None)
+    compiled_rules.pop(rule_id, None)
+    flat_rules.pop(rule_id, None)
+    unindex_rule(rule_id, _rule_anchors.pop(rule_id, ()))
+
+def _eval_packed(present, values, cond_field, cond_op, cond_value, group_start, rule_start, out):
+    """Evaluate packed numeric rules against every row of a batch
+    present/values are (rows, fields) columns; condition c of the flat arrays
+    compares field cond_field[c] using cond_op[c] against cond_value[c], OR
+    group g spans conditions group_start[g]:group_start[g + 1], and rule k
+    spans groups rule_start[k]:rule_start[k + 1]. out[r, k] is set when row r
+    matches rule k. Rows are independent, so they are spread across threads.
+    """
+    for r in prange(values.shape[0]):
+        for k in range(rule_start.shape[0] - 1):
+            matched = False
+            for g in range(rule_start[k], rule_start[k + 1]):
+                ok = True
+                for c in range(group_start[g], group_start[g + 1]):
+                    f = cond_field[c]
+                    if not present[r, f]:
+                        ok = False
+                        break
+                    v = values[r, f]
+                    x = cond_value[c]
+                    op = cond_op[c]
+                    if op == 0:
+                        ok = v == x
+                    elif op == 1:
+                        ok = v != x
+                    elif op == 2:
+                        ok = v < x
+                    elif op == 3:
+                        ok = v > x
+                    elif op == 4:
+                        ok = v <= x
+                    else:
+                        ok = v >= x
+                    if not ok:
+                        break
+                if ok:
+                    matched = True
+                    break
+            out[r, k] = matched
+
+# One kernel serves every rule set, so it compiles once instead of per rule
+eval_packed = njit(parallel=True)(_eval_packed) if njit is not None else None
+
+@lru_cache(maxsize=256)
+def pack_rules(signatures: Tuple) -> Tuple:
+    """Pack numeric rule signatures into the flat arrays _eval_packed takes
+    Returns (fields, cond_field, cond_op, cond_value, group_start, rule_start)
+    """
+    fields = sorted({key for signature in signatures for group in signature for key, _, _ in group})
+    slots = {field: i for i, field in enumerate(fields)}
+    cond_field, cond_op, cond_value = [], [], []
+    group_start, rule_start = [0], [0]
+    for signature in signatures:
+        for group in signature:
+            for key, op, value in group:
+                cond_field.append(slots[key])
+                cond_op.append(_OP_CODES[op])
+                cond_value.append(float(value))
+            group_start.append(len(cond_field))
+        rule_start.append(len(group_start) - 1)
+    return (
+        fields,
+        np.array(cond_field, dtype=np.int32),
+        np.array(cond_op, dtype=np.int8),
+        np.array(cond_value, dtype=np.float64),
+        np.array(group_start, dtype=np.int32),
+        np.array(rule_start, dtype=np.int32)
+    )
+
+def warm_up_kernels():
+    """Compile eval_packed ahead of the first batch request"""
+    if eval_packed is None:
+        return
+    signature = ((Condition('x', '<', 0),),)
+    _, *packed = pack_rules((signature,))
+    eval_packed(np.zeros((1, 1), dtype=np.bool_), np.zeros((1, 1), dtype=np.float64),
+                *packed, np.zeros((1, 1), dtype=np.bool_))
+
+def reorder_parsed_rules():
+    """Re-sort every parsed rule by observed failure rates, as reorder_conditions
+    does: AND conditions most likely to fail first (cheaper comparisons breaking
+    ties), then OR groups most likely to pass first
+    Rules changed or deleted since the snapshot was taken are left alone
+    """
+    for rule_id, rule_conditions in list(parsed_rules.items()):
+        reordered = rule_engine.reorder_conditions(rule_conditions)
+        if reordered == rule_conditions:
+            continue
+        with _rules_lock:
+            if parsed_rules.get(rule_id) is rule_conditions:
+                cache_rule(rule_id, reordered)
+    # Start a fresh window so the next ordering follows recent traffic
+    rule_engine.condition_stats.clear()
+
+_entry_epoch = attrgetter('ts_epoch')
+_entry_labels = attrgetter('labels')
+_entry_matched_rules = attrgetter('matched_rules')
+
+def insert_in_order(entries: deque, entry: ProcessedEntry):
+    """Append an entry, or insert it at its time position if it arrived late
+    A request that straddles a flush can reach the history after newer ones,
+    and the range queries bisect on ts_epoch
+    """
+    if entries and entries[-1].ts_epoch > entry.ts_epoch:
+        entries.insert(bisect_right(entries, entry.ts_epoch, key=_entry_epoch), entry)
+    else:
+        entries.append(entry)
+
+def record_entry(entry: ProcessedEntry):
+    """Add a processed entry to the history and the statistics indexes
+    Once the history is full its oldest entry is popped and taken out of the
+    indexes first; a full deque cannot take a late entry's insert()
+    """
+    global _labeled_total
+    if len(processed_data) == processed_data.maxlen:
+        evict_entry(processed_data.popleft())
+    insert_in_order(processed_data, entry)
+    _labeled_total += bool(entry.labels)
+    _label_totals.update(entry.labels)
+    _rule_match_totals.update(entry.matched_rules)
+    for label in dict.fromkeys(entry.labels):
+        insert_in_order(_label_index.setdefault(label, deque()), entry)
+    
+    day = _day_totals.get(entry.timestamp[:10])
+    if day is None:
+        day = _day_totals[entry.timestamp[:10]] = DayTotals()
+    day.entries += 1
+    day.labeled += bool(entry.labels)
+    day.labels.update(entry.labels)
+
+def evict_entry(entry: ProcessedEntry):
+    """Remove an evicted (oldest) processed entry from the statistics indexes"""
+    global _labeled_total
+    _labeled_total -= bool(entry.labels)
+    _label_totals.subtract(entry.labels)
+    for rule_id in entry.matched_rules:
+        _rule_match_totals[rule_id] -= 1
+        if not _rule_match_totals[rule_id]:
+            del _rule_match_totals[rule_id]
+    for label in dict.fromkeys(entry.labels):
+        if _label_totals[label] <= 0:
+            del _label_totals[label]
+        entries = _label_index[label]
+        entries.popleft()
+        if not entries:
+            del _label_index[label]
+    
+    day = _day_totals[entry.timestamp[:10]]
+    day.entries -= 1
+    if not day.entries:
+        del _day_totals[entry.timestamp[:10]]
+        return
+    day.labeled -= bool(entry.labels)
+    day.labels.subtract(entry.labels)
+
+def record_rule_use(rule: Dict, uses: int, ts_iso: str):
+    """Add to a rule's usage statistics
+    Rules are spread over a few locks by id, so concurrent requests only
+    contend when they update rules sharing a shard
+    """
+    with _usage_locks[hash(rule['id']) & (USAGE_LOCK_SHARDS - 1)]:
+        rule['usage_count'] = rule.get('usage_count', 0) + uses
+        rule['last_used'] = ts_iso
+
+def buffer_entry(entry: ProcessedEntry):
+    """Queue a processed entry in the calling thread's buffer
+    Ingesting threads only meet on _history_lock once per FLUSH_SIZE entries;
+    readers go through history_read() so they always see every entry
+    """
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = []
+        with _history_lock:
+            _pending.append((threading.current_thread(), buffer))
+            registered = len(_pending)
+        if registered >= FLUSH_SIZE:
+            flush_pending()
+    buffer.append(entry)
+    if len(buffer) >= FLUSH_SIZE:
+        flush_pending()
+
+def flush_pending():
+    """Merge every thread's buffered entries into processed_data, oldest first"""
+    global _pending
+    with _history_lock:
+        batch = []
+        for thread, buffer in _pending:
+            # Copy-then-delete so entries appended meanwhile stay queued
+            pending = len(buffer)
+            batch.extend(buffer[:pending])
+            del buffer[:pending]
+        # Threaded servers may use a thread per request, so forget buffers
+        # whose thread has finished once they are drained
+        _pending = [(thread, buffer) for thread, buffer in _pending if buffer or thread.is_alive()]
+        if not batch:
+            return
+        batch.sort(key=_entry_epoch)
+        recorded = 0
+        try:
+            for entry in batch:
+                record_entry(entry)
+                recorded += 1
+        finally:
+            if recorded < len(batch):
+                # Queue whatever was not recorded again for the next flush
+                _pending.append((threading.current_thread(), batch[recorded:]))
+            # Bumped once every index is up to date, so a response cached under
+            # the new version never sees half-recorded entries
+            if recorded:
+                bump_data_version()
+            update_statistics_cache()
+
+@contextmanager
+def history_read():
+    """Merge every buffered entry, then hold _history_lock while the caller
+    reads processed_data and its indexes, which other threads' flushes mutate
+    """
+    with _history_lock:
+        flush_pending()
+        yield
+
+def store_processed(payload: Dict, labels: List[str], matched_rules: List[str],
+                    ts_epoch: float, ts_iso: str) -> ProcessedEntry:
+    """Record a labelled payload in the processed history"""
+    processed_entry = ProcessedEntry(
+        id=_next_id(),
+        payload=payload,
+        labels=labels,
+        matched_rules=matched_rules,
+        timestamp=ts_iso,
+        ts_epoch=ts_epoch
+    )
+    
+    buffer_entry(processed_entry)
+    return processed_entry
+
+def numeric_column(payloads: List[Dict], field: str):
+    """Build (present, values) arrays for a field across a batch of payloads
+    Returns None if any present value is not a plain number, in which case the
+    rules on that field have to run through their compiled predicates
+    """
+    present = np.zeros(len(payloads), dtype=np.bool_)
+    values = np.zeros(len(payloads), dtype=np.float64)
+    for i, payload in enumerate(payloads):
+        value = payload.get(field, _MISSING)
+        if value is _MISSING:
+            continue
+        # ints beyond 2**53 would compare differently once converted to float64
+        if type(value) not in (int, float, bool) or (type(value) is int and abs(value) > 2 ** 53):
+            return None
+        present[i] = True
+        values[i] = value
+    return present, values
+
+def match_numeric(rules: List[Dict], payloads: List[Dict]) -> Dict[str, List[int]]:
+    """Get the indexes of the payloads each purely numeric rule matches
+    All such rules run together in one eval_packed call, or as vectorized
+    NumPy masks when Numba is not installed. Rules that cannot be evaluated
+    on numeric columns are left out of the result.
+    """
+    if np is None or len(payloads) < KERNEL_MIN_BATCH:
+        return {}
+    
+    columns = {}  # field -> numeric_column() arrays, shared across rules
+    numeric = []  # (rule_id, signature)
+    for rule in rules:
+        signature = rule_engine.kernel_signature(parsed_rules[rule['id']])
+        if signature is None:
+            continue
+        for field in {key for group in signature for key, _, _ in group}:
+            if field not in columns:
+                columns[field] = numeric_column(payloads, field)
+            if columns[field] is None:
+                break
+        else:
+            numeric.append((rule['id'], signature))
+    if not numeric:
+        return {}
+    
+    if eval_packed is None:
+        return {rule_id: np.flatnonzero(match_masks(signature, columns, len(payloads))).tolist()
+                for rule_id, signature in numeric}
+    
+    fields, *packed = pack_rules(tuple(signature for _, signature in numeric))
+    present = np.column_stack([columns[field][0] for field in fields])
+    values = np.column_stack([columns[field][1] for field in fields])
+    out = np.zeros((len(payloads), len(numeric)), dtype=np.bool_)
+    eval_packed(present, values, *packed, out)
+    return {rule_id: np.flatnonzero(out[:, k]).tolist() for k, (rule_id, _) in enumerate(numeric)}
+
+def match_masks(signature, columns: Dict, size: int):
+    """Evaluate a numeric rule signature over whole columns with NumPy
+    Each condition is one vectorized comparison, ANDed within an OR group
+    and ORed across groups
+    """
+    out = np.zeros(size, dtype=np.bool_)
+    for group in signature:
+        group_mask = np.ones(size, dtype=np.bool_)
+        for key, op, value in group:
+            present, values = columns[key]
+            group_mask &= present
+            group_mask &= rule_engine.operators[op](values, float(value))
+        out |= group_mask
+    return out
+
+def payload_key(payload: Dict) -> Any:
+    """Get a hashable key for a payload's contents, value types included
+    so that e.g. 1 and '1' or 1 and True stay distinct; payloads with
+    unhashable values fall back to their key-sorted JSON encoding
+    """
+    try:
+        return frozenset(zip(payload, map(type, payload.values()), payload.values()))
+    except TypeError:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+
+def match_rules(payload: Dict, profile: bool = False, first_match_per_label: bool = False) -> Tuple[str, ...]:
+    """Get the ids of the active rules a payload matches, in priority order
+    With profile set the instrumented evaluator runs, recording condition stats.
+    With first_match_per_label set, rules whose label an earlier (higher
+    priority) rule already applied are not evaluated at all.
+    """
+    # Every condition needs its field present, so only rules with an OR
+    # group anchored on one of the payload's fields can match
+    candidate_ids = set()
+    for field in payload:
+        candidate_ids.update(_field_to_rules.get(field, ()))
+    
+    matched = []
+    applied = []  # labels applied so far, when first_match_per_label is set
+    for rule in get_active_rules():
+        if rule['id'] not in candidate_ids:
+            continue
+        if first_match_per_label and rule['label'] in applied:
+            continue
+        try:
+            if profile:
+                result = rule_engine.evaluate_rule_flat(flat_rules[rule['id']], payload)
+            else:
+                result = compiled_rules[rule['id']](payload)
+            if result:
+                matched.append(rule['id'])
+        except Exception as e:
+            print(f"Error evaluating rule {rule['id']}: {e}")
+            continue
+        if result and first_match_per_label:
+            applied.append(rule['label'])
+            # Every label is taken, so no remaining rule can add anything
+            if len(applied) == _active_label_count:
+                break
+    return tuple(matched)
+
+def label_batch(payloads: List[Dict], ts_iso: str) -> List[tuple]:
+    """Apply active rules to a batch of payloads
+    Returns (labels, matched_rules) per payload, in rule priority order
+    """
+    results = [([], []) for _ in payloads]
+    rules = get_active_rules()
+    numeric_matches = match_numeric(rules, payloads)
+    
+    for rule in rules:
+        matches = numeric_matches.get(rule['id'])
+        if matches is None:
+            predicate = compiled_rules[rule['id']]
+            matches = []
+            for i, payload in enumerate(payloads):
+                try:
+                    if predicate(payload):
+                        matches.append(i)
+                except Exception as e:
+                    print(f"Error evaluating rule {rule['id']}: {e}")
+        
+        for i in matches:
+            labels, matched_rules = results[i]
+            labels.append(rule['label'])
+            matched_rules.append(rule['id'])
+        
+        # Update rule usage statistics
+        if matches:
+            record_rule_use(rule, len(matches), ts_iso)
+    
+    return results
+
+def entry_range(entries, from_ts: float = None, to_ts: float = None) -> Tuple[int, int]:
+    """Get the [lo, hi) index range of entries within an epoch range
+    Entries are kept in arrival order, so the range bounds are found by bisection
+    """
+    lo = bisect_left(entries, from_ts, key=_entry_epoch) if from_ts is not None else 0
+    hi = bisect_right(entries, to_ts, key=_entry_epoch) if to_ts is not None else len(entries)
+    return lo, max(lo, hi)
+
+def range_totals(lo: int, hi: int) -> DayTotals:
+    """Aggregate label statistics over processed_data[lo:hi]
+    Days lying wholly inside the range come from the per-day totals; only the
+    partial days at either end are scanned. Callers hold _history_lock.
+    """
+    totals = DayTotals()
+    if lo >= hi:
+        return totals
+    first_day = processed_data[lo].timestamp[:10]
+    last_day = processed_data[hi - 1].timestamp[:10]
+    
+    def scan(start, stop):
+        # One pass pulls out the label lists; counting then stays in C
+        label_lists = list(map(_entry_labels, islice(processed_data, start, stop)))
+        totals.entries += len(label_lists)
+        totals.labeled += len(label_lists) - label_lists.count([])
+        totals.labels.update(chain.from_iterable(label_lists))
+    
+    if first_day == last_day:
+        scan(lo, hi)
+        return totals
+    
+    # Entry timestamps are local time, so day boundaries are local midnights
+    first_end = (datetime.fromisoformat(first_day) + timedelta(days=1)).timestamp()
+    last_start = datetime.fromisoformat(last_day).timestamp()
+    scan(lo, bisect_left(processed_data, first_end, key=_entry_epoch, lo=lo, hi=hi))
+    scan(bisect_left(processed_data, last_start, key=_entry_epoch, lo=lo, hi=hi), hi)
+    for day_key, day in _day_totals.items():
+        if first_day < day_key < last_day:
+            totals.entries += day.entries
+            totals.labeled += day.labeled
+            totals.labels.update(day.labels)
+    return totals
+
 # API Endpoints
 
 @app.route('/api/rules', methods=['POST'])
@@ -115,36 +928,46 @@ def create_rule():
         
         # Validate rule syntax
         try:
-            rule_engine.parse_rule(data['condition'])
+            parsed = parse_rule_text(data['condition'])
         except Exception as e:
             return jsonify({'error': f'Invalid rule syntax: {str(e)}'}), 400
         
-        rule_id = str(uuid.uuid4())
-        rules_storage[rule_id] = {
-            'id': rule_id,
-            'condition': data['condition'],
-            'label': data['label'],
-            'enabled': data.get('enabled', True),
-            'priority': data.get('priority', 1),
-            'created_at': datetime.now().isoformat(),
-            'usage_count': 0,  # Track how many times this rule has been applied
-            'last_used': None
-        }
+        rule_id = _next_id()
+        with _rules_lock:
+            # Cached first, so a rule that fails to compile is never stored
+            cache_rule(rule_id, parsed)
+            rules_storage[rule_id] = {
+                'id': rule_id,
+                'condition': data['condition'],
+                'label': intern_label(data['label']),
+                'enabled': data.get('enabled', True),
+                'priority': data.get('priority', 1),
+                'created_at': datetime.now().isoformat(),
+                'usage_count': 0,  # Track how many times this rule has been applied
+                'last_used': None
+            }
+            refresh_active_rules()
         
         return jsonify(rules_storage[rule_id]), 201
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@lru_cache(maxsize=1)
+def sorted_rules(version: int) -> List[Dict]:
+    # Sort rules by priority (descending) then by creation date; sorts are
+    # stable (reverse=True included), so the second keeps the first's order
+    rules = sorted(rules_storage.values(), key=itemgetter('created_at'))
+    rules.sort(key=itemgetter('priority'), reverse=True)
+    return rules
+
 @app.route('/api/rules', methods=['GET'])
 def get_rules():
-    # Sort rules by priority (descending) then by creation date
-    sorted_rules = sorted(
-        rules_storage.values(), 
-        key=lambda x: (-x['priority'], x['created_at']),
-        reverse=False
-    )
-    return jsonify(sorted_rules)
+    # Usage counts change with processing, which only bumps the version once
+    # the processed entries are merged
+    flush_pending()
+    version = _data_version
+    return conditional_json(str(version), lambda: sorted_rules(version))
 
 @app.route('/api/rules/<rule_id>', methods=['PUT'])
 def update_rule(rule_id):
@@ -155,13 +978,22 @@ def update_rule(rule_id):
         data = request.get_json()
         
         # Validate rule syntax if condition is being updated
+        parsed = None
         if 'condition' in data:
-            rule_engine.parse_rule(data['condition'])
+            parsed = parse_rule_text(data['condition'])
         
         # Update rule
-        rule = rules_storage[rule_id]
-        rule.update(data)
-        rule['updated_at'] = datetime.now().isoformat()
+        with _rules_lock:
+            rule = rules_storage.get(rule_id)
+            if rule is None:  # deleted meanwhile
+                return jsonify({'error': 'Rule not found'}), 404
+            if parsed is not None:
+                cache_rule(rule_id, parsed)
+            rule.update(data)
+            if 'label' in data:
+                rule['label'] = intern_label(data['label'])
+            rule['updated_at'] = datetime.now().isoformat()
+            refresh_active_rules()
         
         return jsonify(rule)
     
@@ -173,8 +1005,11 @@ def delete_rule(rule_id):
     if rule_id not in rules_storage:
         return jsonify({'error': 'Rule not found'}), 404
     
-    del rules_storage[rule_id]
-    update_statistics_cache()
+    with _rules_lock:
+        if rules_storage.pop(rule_id, None) is None:
+            return jsonify({'error': 'Rule not found'}), 404
+        refresh_active_rules()
+        forget_rule(rule_id)
     return jsonify({'message': 'Rule deleted successfully'})
 
 @app.route('/api/rules/<rule_id>/toggle', methods=['POST'])
@@ -182,71 +1017,115 @@ def toggle_rule(rule_id):
     if rule_id not in rules_storage:
         return jsonify({'error': 'Rule not found'}), 404
     
-    rule = rules_storage[rule_id]
-    rule['enabled'] = not rule['enabled']
-    rule['updated_at'] = datetime.now().isoformat()
+    with _rules_lock:
+        rule = rules_storage.get(rule_id)
+        if rule is None:  # deleted meanwhile
+            return jsonify({'error': 'Rule not found'}), 404
+        rule['enabled'] = not rule['enabled']
+        rule['updated_at'] = datetime.now().isoformat()
+        refresh_active_rules()
     
-    update_statistics_cache()
     return jsonify(rule)
 
 @app.route('/api/process', methods=['POST'])
 def process_payload():
     try:
-        payload = request.get_json()
-        if not payload:
-            return jsonify({'error': 'Invalid JSON payload'}), 400
-        
-        # Get active rules sorted by priority
-        active_rules = [rule for rule in rules_storage.values() if rule['enabled']]
-        active_rules.sort(key=lambda x: x['priority'], reverse=True)
+        try:
+            payload = orjson.loads(request.get_data())
+        except orjson.JSONDecodeError:
+            payload = None
+        if not payload or not isinstance(payload, dict):
+            return json_response({'error': 'Invalid JSON payload'}, 400)
+        payload = intern_keys(payload)
+        ts_epoch, ts_iso = _now()
         
         applied_labels = []
         matched_rules = []
         
-        # Apply rules
-        for rule in active_rules:
-            try:
-                rule_conditions = rule_engine.parse_rule(rule['condition'])
-                if rule_engine.evaluate_rule(rule_conditions, payload):
-                    applied_labels.append(rule['label'])
-                    matched_rules.append(rule['id'])
-                    
-                    # Update rule usage statistics
-                    rule['usage_count'] = rule.get('usage_count', 0) + 1
-                    rule['last_used'] = datetime.now().isoformat()
-                    
-            except Exception as e:
-                print(f"Error evaluating rule {rule['id']}: {e}")
-                continue
+        # Most payloads run the compiled predicates; a sample goes through the
+        # instrumented evaluator so condition failure rates keep being tracked
+        profile = next(rule_engine.payloads) % rule_engine.PROFILE_INTERVAL == 0
         
-        # Store processed data with more details
-        processed_entry = {
-            'id': str(uuid.uuid4()),
-            'payload': payload,
-            'labels': applied_labels,
-            'matched_rules': matched_rules,
-            'timestamp': datetime.now().isoformat(),
-            'processing_time_ms': 0  # Could be calculated if needed
-        }
+        # ?first_match_per_label=1 keeps only the highest-priority rule per label
+        first_match_per_label = request.args.get('first_match_per_label', '').lower() in ('1', 'true', 'yes')
         
-        processed_data.append(processed_entry)
+        # Repeated payloads reuse the rule ids they matched last time
+        if profile:
+            matched_ids = match_rules(payload, True, first_match_per_label)
+        else:
+            # The version is read before matching, so a result computed while
+            # the rules changed is stored under a key no later request uses
+            key = (_rules_version, first_match_per_label, payload_key(payload))
+            matched_ids = _match_cache.get(key)
+            if matched_ids is None:
+                matched_ids = match_rules(payload, False, first_match_per_label)
+                with _match_cache_lock:
+                    if len(_match_cache) >= MATCH_CACHE_SIZE:
+                        del _match_cache[next(iter(_match_cache))]
+                    _match_cache[key] = matched_ids
         
-        # Keep only last 1000 entries to prevent memory overflow
-        if len(processed_data) > 1000:
-            processed_data.pop(0)
+        for rule_id in matched_ids:
+            rule = rules_storage.get(rule_id)
+            if rule is None:  # deleted by another request since matching
+                continue
+            applied_labels.append(rule['label'])
+            matched_rules.append(rule_id)
+            
+            # Update rule usage statistics
+            record_rule_use(rule, 1, ts_iso)
         
-        # Update statistics cache
-        update_statistics_cache()
+        # Only one request re-sorts; the others carry on with the current order
+        if rule_engine.evaluations >= rule_engine.REORDER_INTERVAL and _reorder_lock.acquire(blocking=False):
+            try:
+                rule_engine.evaluations = 0
+                reorder_parsed_rules()
+            finally:
+                _reorder_lock.release()
         
-        return jsonify({
-            'id': processed_entry['id'],
+        # Store processed data with more details
+        processed_entry = store_processed(payload, applied_labels, matched_rules, ts_epoch, ts_iso)
+        
+        return json_response({
+            'id': processed_entry.id,
             'labels': applied_labels,
             'matched_rules_count': len(matched_rules),
-            'timestamp': processed_entry['timestamp']
+            'timestamp': ts_iso
         })
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return json_response({'error': str(e)}, 500)
+
+@app.route('/api/process_batch', methods=['POST'])
+@app.route('/api/process/batch', methods=['POST'])
+def process_batch():
+    """Process a batch of payloads sent as {"payloads": [...]}"""
+    try:
+        try:
+            data = orjson.loads(request.get_data())
+        except orjson.JSONDecodeError:
+            data = None
+        payloads = data.get('payloads') if isinstance(data, dict) else None
+        if not isinstance(payloads, list) or not all(p and isinstance(p, dict) for p in payloads):
+            return json_response({'error': 'Expected a list of JSON object payloads in "payloads"'}, 400)
+        
+        payloads = [intern_keys(payload) for payload in payloads]
+        ts_epoch, ts_iso = _now()
+        results = label_batch(payloads, ts_iso)
+        entries = [store_processed(payload, labels, matched_rules, ts_epoch, ts_iso)
+                   for payload, (labels, matched_rules) in zip(payloads, results)]
+
+        return json_response({
+            'processed_count': len(entries),
+            'results': [{
+                'id': entry.id,
+                'labels': entry.labels,
+                'matched_rules_count': len(entry.matched_rules),
+                'timestamp': entry.timestamp
+            } for entry in entries]
+        })
+    
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
 
 @app.route('/api/processed-data', methods=['GET'])
 def get_processed_data():
@@ -256,23 +1135,23 @@ def get_processed_data():
     to_date = request.args.get('to')
     label_filter = request.args.get('label')
     
-    filtered_data = processed_data.copy()
-    
-    # Apply date filters
-    if from_date:
-        from_dt = datetime.fromisoformat(from_date)
-        filtered_data = [d for d in filtered_data if datetime.fromisoformat(d['timestamp']) >= from_dt]
-    
-    if to_date:
-        to_dt = datetime.fromisoformat(to_date)
-        filtered_data = [d for d in filtered_data if datetime.fromisoformat(d['timestamp']) <= to_dt]
-    
-    # Apply label filter
-    if label_filter:
-        filtered_data = [d for d in filtered_data if label_filter in d['labels']]
-    
-    # Apply limit and return most recent first
-    return jsonify(filtered_data[-limit:])
+    # Apply date filters on the stored epochs, parsing each bound once; the
+    # label index already holds just the entries carrying the label
+    from_ts = datetime.fromisoformat(from_date).timestamp() if from_date else None
+    to_ts = datetime.fromisoformat(to_date).timestamp() if to_date else None
+    with history_read():
+        entries = _label_index.get(label_filter, ()) if label_filter else processed_data
+        lo, hi = entry_range(entries, from_ts, to_ts)
+        
+        # Apply limit, keeping the same window as filtered[-limit:] (limit <= 0 included)
+        start = hi - limit if limit > 0 else lo - limit
+        start = min(max(start, lo), hi)
+        
+        # Only the kept entries are serialized, walking back from the newest end
+        # into the response list, which is then put back in arrival order in place
+        data = [entry.to_dict() for entry in islice(reversed(entries), len(entries) - hi, len(entries) - start)]
+    data.reverse()
+    return json_response(data)
 
 @app.route('/api/statistics', methods=['GET'])
 def get_statistics():
@@ -281,51 +1160,67 @@ def get_statistics():
     from_date = request.args.get('from')
     to_date = request.args.get('to')
     
-    # Filter data based on parameters
-    filtered_data = processed_data
-    
-    if from_date:
-        from_dt = datetime.fromisoformat(from_date)
-        filtered_data = [d for d in filtered_data if datetime.fromisoformat(d['timestamp']) >= from_dt]
-    
-    if to_date:
-        to_dt = datetime.fromisoformat(to_date)
-        filtered_data = [d for d in filtered_data if datetime.fromisoformat(d['timestamp']) <= to_dt]
-    
-    if label_filter:
-        filtered_data = [d for d in filtered_data if label_filter in d['labels']]
+    # Cached per data version; the time window bounds how stale the
+    # clock-relative processing rates can get while no new data arrives.
+    # The history and its running totals are only read with the lock held
+    with history_read():
+        version = _data_version
+        window = int(time.time() // STATS_CACHE_SECONDS)
+        return conditional_json(
+            f'{version}-{window}',
+            lambda: compute_statistics(label_filter, from_date, to_date, version, window)
+        )
+
+@lru_cache(maxsize=256)
+def compute_statistics(label_filter: str, from_date: str, to_date: str, version: int, window: int) -> Dict:
+    """Compute statistics for a filter; version and window only key the cache
+    Callers hold _history_lock, as it reads the history and its running totals
+    """
+    # Filter data based on parameters using the time and label indexes
+    from_ts = datetime.fromisoformat(from_date).timestamp() if from_date else None
+    to_ts = datetime.fromisoformat(to_date).timestamp() if to_date else None
+    entries = _label_index.get(label_filter, ()) if label_filter else processed_data
+    lo, hi = entry_range(entries, from_ts, to_ts)
     
     # Calculate statistics
-    total_processed = len(filtered_data)
+    total_processed = hi - lo
     
-    # Label statistics
-    label_counts = {}
-    for entry in filtered_data:
-        for label in entry['labels']:
-            label_counts[label] = label_counts.get(label, 0) + 1
+    # Label statistics: running totals cover the unfiltered case, per-day
+    # totals a date range, and only label-filtered queries scan entries
+    if label_filter:
+        label_counts = Counter(chain.from_iterable(map(_entry_labels, islice(entries, lo, hi))))
+        labeled_records = total_processed  # every entry carries the label
+    elif from_date or to_date:
+        totals = range_totals(lo, hi)
+        label_counts, labeled_records = totals.labels, totals.labeled
+    else:
+        label_counts, labeled_records = _label_totals, _labeled_total
     
     # Calculate percentages
     label_stats = []
-    for label, count in label_counts.items():
-        percentage = (count / total_processed * 100) if total_processed > 0 else 0
+    for label, label_count in label_counts.items():
+        if label_count <= 0:
+            continue
+        percentage = (label_count / total_processed * 100) if total_processed > 0 else 0
         label_stats.append({
             'label': label,
-            'count': count,
+            'count': label_count,
             'percentage': round(percentage, 2)
         })
     
     # Sort by count descending
     label_stats.sort(key=lambda x: x['count'], reverse=True)
     
-    # Processing rate calculations
-    now = datetime.now()
-    last_hour = now - timedelta(hours=1)
-    last_24h = now - timedelta(hours=24)
-    last_week = now - timedelta(days=7)
+    # Processing rate calculations on the stored epoch timestamps; entries
+    # are in arrival order, so each count is one bisection within [lo, hi)
+    now = time.time()
+    last_hour = now - 3600
+    last_24h = now - 24 * 3600
+    last_week = now - 7 * 24 * 3600
     
-    recent_hour = [d for d in filtered_data if datetime.fromisoformat(d['timestamp']) > last_hour]
-    recent_24h = [d for d in filtered_data if datetime.fromisoformat(d['timestamp']) > last_24h]
-    recent_week = [d for d in filtered_data if datetime.fromisoformat(d['timestamp']) > last_week]
+    recent_hour = hi - bisect_right(entries, last_hour, key=_entry_epoch, lo=lo, hi=hi)
+    recent_24h = hi - bisect_right(entries, last_24h, key=_entry_epoch, lo=lo, hi=hi)
+    recent_week = hi - bisect_right(entries, last_week, key=_entry_epoch, lo=lo, hi=hi)
     
     # Rule effectiveness
     rule_effectiveness = {}
@@ -337,22 +1232,22 @@ def get_statistics():
                 'condition': rule['condition']
             }
 
-    return jsonify({
+    return {
         'total_processed': total_processed,
         'label_breakdown': label_stats,
         'processing_rates': {
-            'last_hour': len(recent_hour),
-            'last_24h': len(recent_24h),
-            'last_week': len(recent_week)
+            'last_hour': recent_hour,
+            'last_24h': recent_24h,
+            'last_week': recent_week
         },
         'success_rate': {
-            'labeled_records': len([d for d in filtered_data if d['labels']]),
-            'unlabeled_records': len([d for d in filtered_data if not d['labels']]),
-            'percentage': round((len([d for d in filtered_data if d['labels']]) / total_processed * 100), 2) if total_processed > 0 else 0
+            'labeled_records': labeled_records,
+            'unlabeled_records': total_processed - labeled_records,
+            'percentage': round((labeled_records / total_processed * 100), 2) if total_processed > 0 else 0
         },
         'rule_effectiveness': rule_effectiveness,
         'timestamp': datetime.now().isoformat()
-    })
+    }
 
 @app.route('/api/analytics/timeline', methods=['GET'])
 def get_timeline_analytics():
@@ -362,60 +1257,62 @@ def get_timeline_analytics():
     now = datetime.now()
     start_time = now - timedelta(hours=hours)
     
-    # Filter data to requested time range
-    timeline_data = [d for d in processed_data if datetime.fromisoformat(d['timestamp']) > start_time]
-    
-    # Group by hour
+    # Group by hour. Entry timestamps are local ISO strings, so their first 13
+    # characters ('YYYY-MM-DDTHH') are the local hour; bucketing is a slice and
+    # only the bucket keys themselves are ever formatted
     hourly_counts = {}
     for i in range(hours):
         hour_start = now - timedelta(hours=i)
-        hour_key = hour_start.strftime('%Y-%m-%d %H:00')
+        hour_key = hour_start.isoformat()[:13]
         hourly_counts[hour_key] = {
             'processed': 0,
             'labeled': 0,
             'labels': {}
         }
     
-    for entry in timeline_data:
-        entry_time = datetime.fromisoformat(entry['timestamp'])
-        hour_key = entry_time.strftime('%Y-%m-%d %H:00')
+    with history_read():
+        # Filter data to requested time range (processed_data is in arrival order)
+        timeline_data = islice(processed_data, bisect_right(processed_data, start_time.timestamp(), key=_entry_epoch), None)
         
-        if hour_key in hourly_counts:
-            hourly_counts[hour_key]['processed'] += 1
-            if entry['labels']:
-                hourly_counts[hour_key]['labeled'] += 1
-                for label in entry['labels']:
-                    hourly_counts[hour_key]['labels'][label] = hourly_counts[hour_key]['labels'].get(label, 0) + 1
+        for entry in timeline_data:
+            bucket = hourly_counts.get(entry.timestamp[:13])
+            
+            if bucket is not None:
+                bucket['processed'] += 1
+                if entry.labels:
+                    bucket['labeled'] += 1
+                    for label in entry.labels:
+                        bucket['labels'][label] = bucket['labels'].get(label, 0) + 1
     
-    # Convert to list format for frontend
+    # Convert to list format for frontend ('YYYY-MM-DD HH:00' hour labels)
     timeline_list = []
     for hour_key in sorted(hourly_counts.keys()):
         data = hourly_counts[hour_key]
         timeline_list.append({
-            'hour': hour_key,
+            'hour': f'{hour_key[:10]} {hour_key[11:]}:00',
             'processed': data['processed'],
             'labeled': data['labeled'],
             'labels': data['labels']
         })
     
-    return jsonify(timeline_list)
+    return json_response(timeline_list)
 
 @app.route('/api/rules/analytics', methods=['GET'])
 def get_rule_analytics():
     """Get detailed rule performance analytics"""
     analytics = []
     
+    # Total matches per rule are kept up to date by record_entry/evict_entry;
+    # recent ones are counted once over the last 24h of the history
+    last_24h = time.time() - 24 * 3600
+    with history_read():
+        recent = islice(processed_data, bisect_right(processed_data, last_24h, key=_entry_epoch), None)
+        recent_counts = Counter(chain.from_iterable(map(_entry_matched_rules, recent)))
+        match_totals = _rule_match_totals.copy()
+    
     for rule_id, rule in rules_storage.items():
-        # Count how many times this rule matched in processed data
-        matches = 0
-        recent_matches = 0
-        last_24h = datetime.now() - timedelta(hours=24)
-        
-        for entry in processed_data:
-            if rule_id in entry.get('matched_rules', []):
-                matches += 1
-                if datetime.fromisoformat(entry['timestamp']) > last_24h:
-                    recent_matches += 1
+        matches = match_totals[rule_id]
+        recent_matches = recent_counts[rule_id]
         
         analytics.append({
             'rule_id': rule_id,
@@ -433,7 +1330,7 @@ def get_rule_analytics():
     # Sort by total matches descending
     analytics.sort(key=lambda x: x['total_matches'], reverse=True)
     
-    return jsonify(analytics)
+    return json_response(analytics)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -442,9 +1339,12 @@ def health_check():
     active_rules = len([r for r in rules_storage.values() if r['enabled']])
     total_rules = len(rules_storage)
     
-    # Recent processing activity
-    last_hour = datetime.now() - timedelta(hours=1)
-    recent_activity = len([d for d in processed_data if datetime.fromisoformat(d['timestamp']) > last_hour])
+    # Recent processing activity (processed_data is in arrival order)
+    last_hour = time.time() - 3600
+    with history_read():
+        processed_total = len(processed_data)
+        recent_activity = processed_total - bisect_right(processed_data, last_hour, key=_entry_epoch)
+        history_size = len(str(processed_data))
     
     return jsonify({
         'status': 'healthy',
@@ -453,12 +1353,12 @@ def health_check():
             'rules_total': total_rules,
             'rules_active': active_rules,
             'rules_inactive': total_rules - active_rules,
-            'processed_total': len(processed_data),
+            'processed_total': processed_total,
             'processed_last_hour': recent_activity,
             'memory_usage': {
                 'rules_count': len(rules_storage),
-                'processed_data_count': len(processed_data),
-                'estimated_memory_mb': (len(str(rules_storage)) + len(str(processed_data))) / 1024 / 1024
+                'processed_data_count': processed_total,
+                'estimated_memory_mb': (len(str(rules_storage)) + history_size) / 1024 / 1024
             }
         }
     })
@@ -493,26 +1393,32 @@ def import_rules():
             
             # Test rule syntax
             try:
-                rule_engine.parse_rule(rule_data['condition'])
+                parsed = parse_rule_text(rule_data['condition'])
             except Exception:
                 continue  # Skip invalid rules
             
             # Generate new ID for imported rule
-            rule_id = str(uuid.uuid4())
-            rules_storage[rule_id] = {
-                'id': rule_id,
-                'condition': rule_data['condition'],
-                'label': rule_data['label'],
-                'enabled': rule_data.get('enabled', True),
-                'priority': rule_data.get('priority', 1),
-                'created_at': datetime.now().isoformat(),
-                'usage_count': 0,
-                'last_used': None,
-                'imported': True
-            }
+            rule_id = _next_id()
+            with _rules_lock:
+                try:
+                    cache_rule(rule_id, parsed)
+                except Exception:
+                    continue  # Skip rules that fail to compile
+                rules_storage[rule_id] = {
+                    'id': rule_id,
+                    'condition': rule_data['condition'],
+                    'label': intern_label(rule_data['label']),
+                    'enabled': rule_data.get('enabled', True),
+                    'priority': rule_data.get('priority', 1),
+                    'created_at': datetime.now().isoformat(),
+                    'usage_count': 0,
+                    'last_used': None,
+                    'imported': True
+                }
             imported_count += 1
         
-        update_statistics_cache()
+        with _rules_lock:
+            refresh_active_rules()
         
         return jsonify({
             'message': f'Successfully imported {imported_count} rules',
@@ -524,27 +1430,24 @@ def import_rules():
         return jsonify({'error': str(e)}), 500
 
 def update_statistics_cache():
-    """Update the statistics cache for efficient dashboard queries"""
+    """Update the statistics cache for efficient dashboard queries
+    Label and labeled-entry counts are maintained incrementally by
+    record_entry/evict_entry, so this never rescans processed_data
+    """
     global statistics_cache
     
     total = len(processed_data)
-    label_counts = {}
-    
-    for entry in processed_data:
-        for label in entry['labels']:
-            label_counts[label] = label_counts.get(label, 0) + 1
     
-    # Calculate processing rates
-    now = datetime.now()
-    last_24h = now - timedelta(hours=24)
-    recent_data = [d for d in processed_data if datetime.fromisoformat(d['timestamp']) > last_24h]
+    # Calculate processing rates (processed_data is in arrival order)
+    now, now_iso = _now()
+    last_24h = now - 24 * 3600
     
     statistics_cache = {
         'total_processed': total,
-        'labels': label_counts,
-        'processing_rate_24h': len(recent_data),
-        'success_rate': (len([d for d in processed_data if d['labels']]) / total * 100) if total > 0 else 0,
-        'last_updated': datetime.now().isoformat()
+        'labels': dict(_label_totals),
+        'processing_rate_24h': total - bisect_right(processed_data, last_24h, key=_entry_epoch),
+        'success_rate': (_labeled_total / total * 100) if total > 0 else 0,
+        'last_updated': now_iso
     }
 
 @app.errorhandler(404)
@@ -581,7 +1484,7 @@ if __name__ == '__main__':
     ]
     
     for rule_data in sample_rules:
-        rule_id = str(uuid.uuid4())
+        rule_id = _next_id()
         rules_storage[rule_id] = {
             'id': rule_id,
             'condition': rule_data['condition'],
@@ -592,15 +1495,19 @@ if __name__ == '__main__':
             'usage_count': 0,
             'last_used': None
         }
+        cache_rule(rule_id, parse_rule_text(rule_data['condition']))
+    refresh_active_rules()
+    
+    warm_up_kernels()
     
     print(f"Started with {len(rules_storage)} sample rules")
     print("API Endpoints:")
     print("- POST /api/process - Process data payload")
+    print("- POST /api/process_batch (or /api/process/batch) - Process a batch of payloads")
     print("- GET /api/statistics - Get processing statistics") 
     print("- GET /api/processed-data - Get processed data history")
     print("- GET /api/rules - Get all rules")
     print("- GET /api/health - Health check")
     
-import os
 port = int(os.environ.get("PORT", 5000))
 app.run(debug=True, host="0.0.0.0", port=port)